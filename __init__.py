@@ -1,8 +1,22 @@
 # This will make sure the app is always imported when
 # Django starts so that shared_task will use this app.
-try:
-    from .celery import app as celery_app
-    __all__ = ('celery_app',)
-except ImportError:
-    # Celery not available or Django not configured yet
-    pass
\ No newline at end of file
+#
+# Processes that never publish tasks (migrate, collectstatic, ...; see
+# manage.py) set WEWORKLOCAL_LAZY_CELERY=1 to skip the import. The app is
+# then only loaded on first access to ``weworklocal.celery_app``.
+import os
+
+if os.environ.get('WEWORKLOCAL_LAZY_CELERY') != '1':
+    try:
+        from .celery import app as celery_app
+        __all__ = ('celery_app',)
+    except ImportError:
+        # Celery not available or Django not configured yet
+        pass
+
+
+def __getattr__(name):
+    if name == 'celery_app':
+        from .celery import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
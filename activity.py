@@ -0,0 +1,108 @@
+"""
+Buffered audit logging and session activity tracking.
+
+``record_audit()`` queues an ``audit_logs`` row instead of inserting it
+inside the admin action, and ``SessionActivityMiddleware`` queues a
+``user_sessions.last_activity`` touch instead of updating it on every
+authenticated page view. Both are written in bulk by
+``weworklocal.buffers``.
+
+A session is touched at most once per ``SESSION_ACTIVITY_INTERVAL``
+seconds across all workers. The gate is a ``cache.add()`` key, which lives
+in Redis in production.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+from . import buffers
+from .throttling import get_client_ip
+
+SESSION_TOUCH_PREFIX = 'session-touch:'
+
+audit_log_buffer = buffers.register(buffers.BulkInsertBuffer(
+    'core.AuditLog',
+    max_size=getattr(settings, 'AUDIT_LOG_BUFFER_SIZE', 100),
+    interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 5),
+))
+
+session_activity_buffer = buffers.register(buffers.CoalescingUpdateBuffer(
+    'authentication.UserSession',
+    key_field='session_key',
+    timestamp_field='last_activity',
+    interval=getattr(settings, 'SESSION_ACTIVITY_FLUSH_INTERVAL', 5),
+))
+
+
+def record_audit(action, model_name, object_id, description='', old_values=None,
+                 new_values=None, user=None, request=None):
+    """Queue an ``audit_logs`` entry; it is written within a few seconds.
+
+    ``old_values``/``new_values`` must be JSON-serialisable.
+    """
+    if user is None and request is not None:
+        user = getattr(request, 'user', None)
+    audit_log_buffer.add(
+        action=action,
+        model_name=model_name,
+        object_id=str(object_id),
+        description=description,
+        old_values=old_values or {},
+        new_values=new_values or {},
+        user_id=user.pk if user is not None and user.is_authenticated else None,
+        ip_address=get_client_ip(request) or None,
+        user_agent=request.META.get('HTTP_USER_AGENT', '') if request is not None else '',
+    )
+
+
+def touch_session(session_key):
+    """Queue a ``last_activity`` update unless one was queued recently."""
+    interval = getattr(settings, 'SESSION_ACTIVITY_INTERVAL', 60)
+    if cache.add(SESSION_TOUCH_PREFIX + session_key, 1, interval):
+        session_activity_buffer.touch(session_key)
+
+
+async def atouch_session(session_key):
+    """Async version of ``touch_session()``."""
+    interval = getattr(settings, 'SESSION_ACTIVITY_INTERVAL', 60)
+    if await cache.aadd(SESSION_TOUCH_PREFIX + session_key, 1, interval):
+        session_activity_buffer.touch(session_key)
+
+
+def _session_key(request, user):
+    session = getattr(request, 'session', None)
+    if user is not None and user.is_authenticated and session is not None:
+        return session.session_key
+    return None
+
+
+class SessionActivityMiddleware:
+    """Record activity for authenticated sessions without a per-request write."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        session_key = _session_key(request, getattr(request, 'user', None))
+        if session_key:
+            touch_session(session_key)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        # request.user is lazy and would hit the database from the event loop
+        auser = getattr(request, 'auser', None)
+        session_key = _session_key(request, await auser() if auser is not None else None)
+        if session_key:
+            await atouch_session(session_key)
+        return response
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class WeWorkLocalConfig(AppConfig):
+    name = 'weworklocal'
+    verbose_name = 'WeWorkLocal'
+
+    def ready(self):
+        # Connect the hot-cache invalidation receivers in every process that
+        # sets up Django: web, Celery, shell, loaddata, management commands.
+        from . import lookups  # noqa: F401
@@ -9,22 +9,39 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from channels.security.websocket import AllowedHostsOriginValidator
+from channels.routing import ProtocolTypeRouter
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weworklocal.settings')
 
 django_asgi_app = get_asgi_application()
 
-# Import routing after Django setup
-from support.routing import websocket_urlpatterns
+
+class LazyWebsocketApplication:
+    """Build the websocket stack on the first websocket connection.
+
+    Importing support.routing pulls in the chat consumers and the Channels
+    auth middleware; workers that only ever serve HTTP never load them.
+    """
+
+    def __init__(self):
+        self.app = None
+
+    async def __call__(self, scope, receive, send):
+        if self.app is None:
+            from channels.auth import AuthMiddlewareStack
+            from channels.routing import URLRouter
+            from channels.security.websocket import AllowedHostsOriginValidator
+            from support.routing import websocket_urlpatterns
+
+            self.app = AllowedHostsOriginValidator(
+                AuthMiddlewareStack(
+                    URLRouter(websocket_urlpatterns)
+                )
+            )
+        return await self.app(scope, receive, send)
+
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
-            URLRouter(websocket_urlpatterns)
-        )
-    ),
+    "websocket": LazyWebsocketApplication(),
 })
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Benchmark per-request database connection cost for each DB_POOL_MODE.
+
+Every mode runs in a fresh interpreter. Each simulated request is wrapped
+in request_started/request_finished, so Django opens, reuses or returns its
+connection exactly as it does for a real request, and runs one SELECT 1.
+
+Usage (from the project root, against the production database):
+    python bench_db_connections.py --requests 500 --modes off persistent native
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def run_requests(count):
+    """Child process: time ``count`` simulated requests and print JSON timings."""
+    import django
+    django.setup()
+
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        request_started.send(sender=None)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        request_finished.send(sender=None)
+        timings.append(time.perf_counter() - start)
+    print(json.dumps(timings))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--modes', nargs='+', default=['off', 'persistent', 'native'])
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_requests(args.requests)
+        return
+
+    print(f"{'mode':<12}{'first ms':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for mode in args.modes:
+        env = dict(os.environ, DB_POOL_MODE=mode)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'weworklocal.production_settings')
+        result = subprocess.run(
+            [sys.executable, __file__, '--child', '--requests', str(args.requests)],
+            env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print(f"{mode:<12}failed: {result.stderr.strip().splitlines()[-1]}")
+            continue
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:<12}"
+            f"{timings[0] * 1000:>10.2f}"
+            f"{statistics.mean(timings) * 1000:>10.2f}"
+            f"{percentile(timings, 50) * 1000:>10.2f}"
+            f"{percentile(timings, 95) * 1000:>10.2f}"
+            f"{sum(timings):>10.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
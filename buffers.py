@@ -0,0 +1,174 @@
+"""
+In-process write buffers that move audit-style writes off the request path.
+
+Writes are queued in memory and flushed by a background thread every
+``interval`` seconds, or as soon as ``max_size`` are waiting:
+``BulkInsertBuffer`` with one ``bulk_create``, ``CoalescingUpdateBuffer``
+with one UPDATE for every queued key. The thread is started lazily on
+first use, so it is created in each forked gunicorn/Celery worker rather
+than in the preloading master, and pending writes are flushed at
+interpreter exit.
+
+Flushes only ever run on that thread (or at exit), never on the caller's
+connection: a failing batch cannot break the caller's transaction, and a
+caller rolling back cannot take other requests' rows with it.
+
+Rows still buffered when a worker is killed (SIGKILL, OOM) are lost, so
+only use this for data where that is acceptable: audit trails and activity
+timestamps, never money.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.apps import apps
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+logger = logging.getLogger('weworklocal')
+
+
+class FlushingBuffer:
+    """Base class: queued writes plus a lazily started flush thread.
+
+    Subclasses keep their queue in ``self._pending`` (guarded by
+    ``self._lock``) and implement ``_empty()`` and ``_write(target, pending)``.
+    The target is the model named by ``model_label`` unless ``_target()``
+    is overridden.
+    """
+
+    def __init__(self, model_label, max_size=100, interval=5.0):
+        self.model_label = model_label
+        self.max_size = max_size
+        self.interval = interval
+        self._pending = self._empty()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+
+    def _empty(self):
+        raise NotImplementedError
+
+    def _write(self, target, pending):
+        raise NotImplementedError
+
+    def _target(self):
+        return apps.get_model(self.model_label)
+
+    def _queued(self, full):
+        # Called after queueing, outside the lock.
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything queued. Returns the number of entries written.
+
+        Only the flush thread and ``stop()`` call this.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, self._empty()
+            if not pending:
+                return 0
+            try:
+                self._write(self._target(), pending)
+            except Exception:
+                logger.exception('Dropped %d buffered %s writes', len(pending), self.model_label)
+                return 0
+            return len(pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f'buffer-{self.model_label}', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            close_old_connections()
+            self.flush()
+            # The thread has its own connection; don't hold it between flushes.
+            connections.close_all()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still queued."""
+        self._stopped.set()
+        self._wake.set()
+        self.flush()
+
+
+class BulkInsertBuffer(FlushingBuffer):
+    """Queue model rows and insert them in batches."""
+
+    def _empty(self):
+        return []
+
+    def add(self, **fields):
+        """Queue one row; a full batch wakes the flush thread."""
+        with self._lock:
+            self._pending.append(fields)
+            full = len(self._pending) >= self.max_size
+        self._queued(full)
+
+    def _write(self, model, rows):
+        model.objects.bulk_create([model(**fields) for fields in rows], batch_size=self.max_size)
+
+
+class CoalescingUpdateBuffer(FlushingBuffer):
+    """Queue "touch" timestamps and write them as one UPDATE per flush.
+
+    Repeated touches of the same key before a flush collapse into one, and
+    every queued row gets the flush time, which is at most ``interval``
+    seconds later than the touch.
+    """
+
+    def __init__(self, model_label, key_field, timestamp_field, max_size=500, interval=5.0):
+        self.key_field = key_field
+        self.timestamp_field = timestamp_field
+        super().__init__(model_label, max_size=max_size, interval=interval)
+
+    def _empty(self):
+        return set()
+
+    def touch(self, key):
+        with self._lock:
+            self._pending.add(key)
+            full = len(self._pending) >= self.max_size
+        self._queued(full)
+
+    def _write(self, model, keys):
+        keys = list(keys)
+        now = timezone.now()
+        for start in range(0, len(keys), self.max_size):
+            model.objects.filter(
+                **{f'{self.key_field}__in': keys[start:start + self.max_size]}
+            ).update(**{self.timestamp_field: now})
+
+
+_buffers = []
+
+
+def register(buffer):
+    """Track ``buffer`` so it is flushed when the process exits."""
+    _buffers.append(buffer)
+    return buffer
+
+
+@atexit.register
+def flush_all():
+    for buffer in _buffers:
+        try:
+            buffer.stop()
+        except Exception:
+            logger.exception('Failed to flush %s buffer at exit', buffer.model_label)
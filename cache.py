@@ -0,0 +1,202 @@
+"""
+Two-tier cache for hot, read-mostly lookups.
+
+Values are kept in a small per-process LRU in front of the shared Django
+cache (Redis in production). Misses are recomputed by a single caller
+(single-flight): one thread per process and, through ``cache.add()``, one
+process per key across gunicorn/Celery workers, while the others wait for
+the shared value instead of stampeding the database.
+
+Entries are invalidated from model ``post_save``/``post_delete`` signals.
+A signal only reaches the process that did the write, so the local tier
+also carries a short TTL (``LOCAL_CACHE_TTL``) that bounds how long other
+workers can serve a stale copy.
+
+Invalidating a key also gives it a new generation in the shared cache, and
+shared entries record the generation they were loaded under. A loader that
+read the old row before an invalidation therefore cannot leave its stale
+result behind: it is not stored, and if it was stored it no longer matches.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .metrics import count_cache_lookup
+
+# v2: entries are (value, generation) pairs
+KEY_PREFIX = 'hot:v2:'
+LOCK_PREFIX = 'hot-lock:'
+GENERATION_PREFIX = 'hot-gen:'
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=512, ttl=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+    """Local LRU -> shared cache -> loader, with single-flight recompute."""
+
+    def __init__(self, timeout=300, local_maxsize=512, local_ttl=5,
+                 lock_timeout=10, wait_interval=0.05, lock_stripes=64):
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.wait_interval = wait_interval
+        self.local = LocalLRU(maxsize=local_maxsize, ttl=local_ttl)
+        # A fixed set of locks shared by hashing keys, so memory does not
+        # grow with the number of distinct keys. Loaders must not call
+        # get_or_set() themselves: the inner key may share the lock.
+        self._key_locks = [threading.Lock() for _ in range(lock_stripes)]
+
+    def _key_lock(self, key):
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    def get_or_set(self, key, loader, timeout=None):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss.
+
+        Entries are ``(value, generation)`` pairs, which also makes ``None``
+        cacheable.
+        """
+        entry = self.local.get(key)
+        if entry is not None:
+            count_cache_lookup(hit=True)
+            return entry[0]
+
+        entry = self._get_shared(key)
+        count_cache_lookup(hit=entry is not None)
+        if entry is not None:
+            self.local.set(key, entry)
+            return entry[0]
+
+        # Only one thread per process goes on to the shared lock/loader.
+        with self._key_lock(key):
+            entry = self.local.get(key)
+            if entry is not None:
+                return entry[0]
+            entry, current = self._load_shared(key, loader, timeout)
+            if current:
+                self.local.set(key, entry)
+            return entry[0]
+
+    def _get_shared(self, key):
+        """The shared entry for ``key`` if it belongs to the current generation."""
+        full_key = KEY_PREFIX + key
+        generation_key = GENERATION_PREFIX + key
+        found = shared_cache.get_many([full_key, generation_key])
+        entry = found.get(full_key)
+        if entry is None or entry[1] != found.get(generation_key):
+            return None
+        return entry
+
+    def _load_shared(self, key, loader, timeout):
+        """Return ``(entry, current)``; ``current`` is False for a load that
+        was invalidated while it ran and must not be cached."""
+        lock_key = LOCK_PREFIX + key
+        generation_key = GENERATION_PREFIX + key
+        deadline = time.monotonic() + self.lock_timeout
+        while not shared_cache.add(lock_key, 1, self.lock_timeout):
+            # Another process is recomputing; wait for its result.
+            entry = self._get_shared(key)
+            if entry is not None:
+                return entry, True
+            if time.monotonic() >= deadline:
+                # The holder died or is very slow; compute without the lock.
+                return (loader(), None), False
+            time.sleep(self.wait_interval)
+
+        try:
+            entry = self._get_shared(key)
+            if entry is not None:
+                return entry, True
+            generation = shared_cache.get(generation_key)
+            entry = (loader(), generation)
+            if shared_cache.get(generation_key) != generation:
+                return entry, False
+            shared_cache.set(
+                KEY_PREFIX + key, entry,
+                self.timeout if timeout is None else timeout,
+            )
+            return entry, True
+        finally:
+            shared_cache.delete(lock_key)
+
+    def invalidate(self, *keys):
+        """Drop ``keys`` from both tiers."""
+        for key in keys:
+            self.local.delete(key)
+        # Generations never expire; an evicted one only costs a reload.
+        shared_cache.set_many({GENERATION_PREFIX + key: uuid.uuid4().hex for key in keys}, None)
+        shared_cache.delete_many([KEY_PREFIX + key for key in keys])
+
+
+hot_cache = TieredCache(
+    timeout=getattr(settings, 'HOT_CACHE_TIMEOUT', 300),
+    local_maxsize=getattr(settings, 'LOCAL_CACHE_MAXSIZE', 512),
+    local_ttl=getattr(settings, 'LOCAL_CACHE_TTL', 5),
+)
+
+
+def invalidate_on_change(*senders, keys, ignore_fields=()):
+    """Invalidate cache keys whenever any of ``senders`` is saved or deleted.
+
+    ``senders`` are ``'app_label.ModelName'`` strings, resolved lazily so
+    this can be called before the apps are loaded. ``keys`` is either a
+    list of keys or a callable taking the instance and returning one, for
+    per-object entries. A ``save(update_fields=...)`` touching only
+    ``ignore_fields`` (fields the entry does not contain) is skipped.
+    Invalidation runs after the surrounding transaction commits, so the
+    entry is not dropped before the new row is visible.
+    """
+    ignore_fields = frozenset(ignore_fields)
+
+    def receiver(sender, instance, using=None, update_fields=None, **kwargs):
+        if update_fields and ignore_fields and update_fields <= ignore_fields:
+            return
+        targets = keys(instance) if callable(keys) else keys
+        if isinstance(targets, str):
+            targets = [targets]
+        transaction.on_commit(lambda: hot_cache.invalidate(*targets), using=using)
+
+    for sender in senders:
+        post_save.connect(receiver, sender=sender, weak=False)
+        post_delete.connect(receiver, sender=sender, weak=False)
+    return receiver
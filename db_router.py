@@ -0,0 +1,202 @@
+"""
+Primary/replica database routing.
+
+Reads of models listed in ``DATABASE_REPLICA_MODELS`` (an app label, or
+``app_label.modelname``) go to a healthy replica; everything else,
+including every write and every read inside a transaction on the primary,
+stays on ``default``. Money-moving models (wallets, payments, withdrawals,
+commissions, ledgers) are simply never listed.
+
+Read-your-writes: once a request writes, or a user sent a write request
+within the last ``REPLICA_PIN_SECONDS``, that request's reads go to the
+primary. ``PrimaryPinMiddleware`` carries the pin across requests through
+the cache.
+
+Replica health is checked at most every ``REPLICA_HEALTH_CHECK_INTERVAL``
+seconds per process. A replica that errors or lags more than
+``REPLICA_MAX_LAG`` seconds is skipped until the next check, and so is a
+replica whose check is still running. Reads fall back to the primary when
+no replica is usable. The check runs on the request path, so replica
+connections carry a short ``connect_timeout`` (``REPLICA_CONNECT_TIMEOUT``).
+"""
+
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger('weworklocal')
+
+PIN_KEY = 'db-pin:{}'
+
+_pinned = contextvars.ContextVar('weworklocal_db_pinned', default=False)
+_wrote = contextvars.ContextVar('weworklocal_db_wrote', default=False)
+
+_health = {}
+_health_lock = threading.Lock()
+
+POSTGRES_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def replication_lag(alias):
+    """Seconds the replica is behind the primary (0 for non-PostgreSQL)."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRES_LAG_SQL)
+            return float(cursor.fetchone()[0] or 0)
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+        return 0.0
+
+
+def is_healthy(alias):
+    """Cached health/lag check for one replica."""
+    now = time.monotonic()
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, True))
+        if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return healthy
+        # Other callers skip the replica until this check finishes, rather
+        # than piling on or routing to a replica that may be down.
+        _health[alias] = (now, False)
+
+    try:
+        lag = replication_lag(alias)
+        healthy = lag <= settings.REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning('Replica %s is %.1fs behind, reading from primary', alias, lag)
+    except Exception:
+        logger.warning('Replica %s failed its health check, reading from primary', alias)
+        connections[alias].close()
+        healthy = False
+
+    with _health_lock:
+        _health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+def pin_to_primary():
+    """Send the rest of this request's (or task's) reads to the primary."""
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+try:
+    from celery.signals import task_prerun
+except ImportError:
+    pass
+else:
+    # A write pins the worker's context; start every task unpinned again.
+    task_prerun.connect(lambda **kwargs: (_pinned.set(False), _wrote.set(False)), weak=False)
+
+
+class PrimaryReplicaRouter:
+    """Route allow-listed reads to replicas and everything else to the primary."""
+
+    def _replica_eligible(self, model):
+        allowed = settings.DATABASE_REPLICA_MODELS
+        meta = model._meta
+        return meta.app_label in allowed or meta.label_lower in allowed
+
+    def db_for_read(self, model, **hints):
+        if not self._replica_eligible(model) or is_pinned():
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see that transaction's writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in replica_aliases() if is_healthy(alias)]
+        if not healthy:
+            return DEFAULT_DB_ALIAS
+        return random.choice(healthy)
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryPinMiddleware:
+    """Keep a user's reads on the primary for a short window after a write.
+
+    Under ASGI the view runs in a sync thread; the pin and write flags it
+    sets come back to this context when ``sync_to_async`` returns.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        pinned_token = _pinned.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            user = getattr(request, 'user', None)
+            user_id = user.pk if user is not None and user.is_authenticated else None
+            if user_id is not None and cache.get(PIN_KEY.format(user_id)):
+                pin_to_primary()
+
+            response = self.get_response(request)
+
+            if self._starts_window(request, user_id):
+                cache.set(PIN_KEY.format(user_id), 1, settings.REPLICA_PIN_SECONDS)
+            return response
+        finally:
+            _wrote.reset(wrote_token)
+            _pinned.reset(pinned_token)
+
+    async def __acall__(self, request):
+        pinned_token = _pinned.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            # request.user is lazy and would hit the database from the event loop
+            auser = getattr(request, 'auser', None)
+            user = await auser() if auser is not None else None
+            user_id = user.pk if user is not None and user.is_authenticated else None
+            if user_id is not None and await cache.aget(PIN_KEY.format(user_id)):
+                pin_to_primary()
+
+            response = await self.get_response(request)
+
+            if self._starts_window(request, user_id):
+                await cache.aset(PIN_KEY.format(user_id), 1, settings.REPLICA_PIN_SECONDS)
+            return response
+        finally:
+            _wrote.reset(wrote_token)
+            _pinned.reset(pinned_token)
+
+    def _starts_window(self, request, user_id):
+        # Only a write starts (or extends) the window, not a pinned read.
+        return user_id is not None and (_wrote.get() or request.method not in self.SAFE_METHODS)
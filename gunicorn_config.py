@@ -1,19 +1,36 @@
 # Gunicorn configuration for WeWorkLocal
 # Save this file as: /home/weworklocal/weworklocal/gunicorn_config.py
 
-import multiprocessing
-import os
+# Server mode: "wsgi" (sync workers) or "asgi" (uvicorn workers serving
+# weworklocal.asgi, including the Channels websocket routes). Set
+# GUNICORN_MODE in the supervisor environment to switch, and
+# GUNICORN_WORKERS to override the worker count. production_settings sizes
+# the connection pools from the same helper.
+from weworklocal.server_mode import SERVER_MODE, worker_count
+
 
 # Server socket
 bind = "unix:/home/weworklocal/weworklocal/gunicorn.sock"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+if SERVER_MODE == "asgi":
+    # Each uvicorn worker multiplexes requests on an event loop: async
+    # views waiting on the bank API or SMTP do not pin the process. Sync
+    # views still run one at a time per worker, in Django's sync thread.
+    wsgi_app = "weworklocal.asgi:application"
+    worker_class = "weworklocal.workers.DjangoUvicornWorker"
+    # HTTP keep-alive towards nginx (see the upstream block in nginx_weworklocal.conf)
+    keepalive = 5
+else:
+    wsgi_app = "weworklocal.wsgi:application"
+    worker_class = "sync"
+    keepalive = 2
+workers = worker_count(SERVER_MODE)
 worker_connections = 1000
 timeout = 30
-keepalive = 2
+# Time given to in-flight requests after SIGTERM/HUP before workers are killed
+graceful_timeout = 30
 
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
@@ -64,3 +81,13 @@ def post_worker_init(worker):
 
 def worker_abort(worker):
     worker.log.info("Worker aborted (pid: %s)", worker.pid)
+
+def worker_exit(server, worker):
+    # Close database connections cleanly instead of letting PostgreSQL
+    # time them out when the worker is recycled (max_requests).
+    try:
+        from django.db import connections
+        connections.close_all()
+    except Exception:
+        pass
+    server.log.info("Worker exited (pid: %s)", worker.pid)
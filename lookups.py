@@ -0,0 +1,149 @@
+"""
+Cached lookups for read-mostly objects used on nearly every page render.
+
+Each lookup goes through ``weworklocal.cache.hot_cache`` and is invalidated
+precisely from the owning model's save/delete signals. Models are resolved
+through the app registry so importing this module does not import the apps.
+
+The cached objects are shared by every request in the process, so the
+getters hand out copies that callers are free to modify.
+"""
+
+import copy
+
+from django.apps import apps
+from django.utils import timezone
+
+from .cache import hot_cache, invalidate_on_change
+
+PAYMENT_SETTINGS_KEY = 'payment_settings'
+APP_SETTINGS_KEY = 'app_settings'
+ACTIVE_BANNERS_KEY = 'active_banners'
+FAQS_KEY = 'faqs'
+EXECUTIVE_CONTACTS_KEY = 'executive_contacts'
+SUBSCRIPTION_PLANS_KEY = 'subscription_plans'
+SIMPLE_SUBSCRIPTION_PLANS_KEY = 'simple_subscription_plans'
+PROPERTY_CARD_KEY = 'property_card:{}'
+
+# view_count/share_count change on every view or share, so they are read
+# from the row itself rather than cached with the card.
+PROPERTY_CARD_FIELDS = (
+    'id', 'title', 'city', 'state', 'price', 'area_sqft', 'bedrooms',
+    'bathrooms', 'property_type', 'listing_type', 'is_featured', 'is_premium',
+    'category__name',
+)
+
+
+def get_payment_settings():
+    """Return the PaymentSettings row (or None if not configured)."""
+    def load():
+        PaymentSettings = apps.get_model('subscriptions', 'PaymentSettings')
+        return PaymentSettings.objects.order_by('id').first()
+    return copy.copy(hot_cache.get_or_set(PAYMENT_SETTINGS_KEY, load))
+
+
+def get_app_setting(key, default=None):
+    """Return an ``app_settings`` value by key."""
+    def load():
+        AppSettings = apps.get_model('core', 'AppSettings')
+        return dict(AppSettings.objects.values_list('key', 'value'))
+    return copy.deepcopy(hot_cache.get_or_set(APP_SETTINGS_KEY, load).get(key, default))
+
+
+def get_active_banners(role=None):
+    """Return active banners visible now, optionally limited to a user role.
+
+    Only ``is_active`` is applied in SQL; the display window and
+    ``target_user_roles`` are checked per call so the cached list stays
+    valid as time passes. An empty ``target_user_roles`` means everyone.
+    """
+    def load():
+        Banner = apps.get_model('core', 'Banner')
+        return list(Banner.objects.filter(is_active=True).order_by('order', '-created_at'))
+
+    now = timezone.now()
+    return [
+        copy.copy(banner) for banner in hot_cache.get_or_set(ACTIVE_BANNERS_KEY, load)
+        if banner.show_from <= now
+        and (banner.show_until is None or banner.show_until >= now)
+        and (role is None or not banner.target_user_roles or role in banner.target_user_roles)
+    ]
+
+
+def get_faqs(category=None):
+    """Return active FAQs, optionally for one category."""
+    def load():
+        FAQ = apps.get_model('support', 'FAQ')
+        return list(FAQ.objects.filter(is_active=True).order_by('category', 'order'))
+
+    faqs = hot_cache.get_or_set(FAQS_KEY, load)
+    return [copy.copy(faq) for faq in faqs if category is None or faq.category == category]
+
+
+def get_executive_contacts():
+    """Return available executive contacts, primary contact first."""
+    def load():
+        ExecutiveContact = apps.get_model('core', 'ExecutiveContact')
+        return list(
+            ExecutiveContact.objects.filter(is_available=True).order_by('-is_primary', 'order')
+        )
+    return [copy.copy(contact) for contact in hot_cache.get_or_set(EXECUTIVE_CONTACTS_KEY, load)]
+
+
+def get_subscription_plans(plan_type=None):
+    """Return active subscription plans, optionally for one plan type."""
+    def load():
+        SubscriptionPlan = apps.get_model('subscriptions', 'SubscriptionPlan')
+        return list(SubscriptionPlan.objects.filter(is_active=True).order_by('plan_type', 'price'))
+
+    plans = hot_cache.get_or_set(SUBSCRIPTION_PLANS_KEY, load)
+    return [copy.copy(plan) for plan in plans if plan_type is None or plan.plan_type == plan_type]
+
+
+def get_simple_subscription_plans(role=None):
+    """Return simple subscription plans, optionally for one role."""
+    def load():
+        SimpleSubscriptionPlan = apps.get_model('subscriptions', 'SimpleSubscriptionPlan')
+        return list(SimpleSubscriptionPlan.objects.order_by('role', 'price'))
+
+    plans = hot_cache.get_or_set(SIMPLE_SUBSCRIPTION_PLANS_KEY, load)
+    return [copy.copy(plan) for plan in plans if role is None or plan.role == role]
+
+
+def get_property_card(property_id):
+    """Return the listing-card fields of an approved property, or None."""
+    def load():
+        Property = apps.get_model('properties', 'Property')
+        return (
+            Property.objects.filter(pk=property_id, status='approved')
+            .values(*PROPERTY_CARD_FIELDS)
+            .first()
+        )
+    card = hot_cache.get_or_set(PROPERTY_CARD_KEY.format(property_id), load)
+    return dict(card) if card is not None else None
+
+
+invalidate_on_change('subscriptions.PaymentSettings', keys=[PAYMENT_SETTINGS_KEY])
+invalidate_on_change('core.AppSettings', keys=[APP_SETTINGS_KEY])
+invalidate_on_change('core.Banner', keys=[ACTIVE_BANNERS_KEY])
+invalidate_on_change('support.FAQ', keys=[FAQS_KEY])
+invalidate_on_change('core.ExecutiveContact', keys=[EXECUTIVE_CONTACTS_KEY])
+invalidate_on_change('subscriptions.SubscriptionPlan', keys=[SUBSCRIPTION_PLANS_KEY])
+invalidate_on_change('subscriptions.SimpleSubscriptionPlan', keys=[SIMPLE_SUBSCRIPTION_PLANS_KEY])
+invalidate_on_change(
+    'properties.Property',
+    keys=lambda instance: PROPERTY_CARD_KEY.format(instance.pk),
+    # View/share counter bumps must save with update_fields to keep the card.
+    ignore_fields=('view_count', 'share_count'),
+)
+
+
+def _category_card_keys(category):
+    # Cards show the category name. Properties removed along with a deleted
+    # category invalidate their own cards.
+    Property = apps.get_model('properties', 'Property')
+    property_ids = Property.objects.filter(category=category).values_list('pk', flat=True)
+    return [PROPERTY_CARD_KEY.format(pk) for pk in property_ids]
+
+
+invalidate_on_change('properties.PropertyCategory', keys=_category_card_keys)
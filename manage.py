@@ -3,10 +3,19 @@
 import os
 import sys
 
+# Commands that never publish Celery tasks, so they skip loading the Celery
+# app at startup (see weworklocal/__init__.py).
+LAZY_CELERY_COMMANDS = {
+    'check', 'collectstatic', 'compilemessages', 'makemigrations',
+    'migrate', 'showmigrations', 'sqlmigrate',
+}
+
 
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weworklocal.settings')
+    if len(sys.argv) > 1 and sys.argv[1] in LAZY_CELERY_COMMANDS:
+        os.environ.setdefault('WEWORKLOCAL_LAZY_CELERY', '1')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -0,0 +1,414 @@
+"""
+Per-view request metrics and a slow-request sampler.
+
+``RequestMetricsMiddleware`` records, for each resolved URL name, the wall
+time, the number of database queries and the time spent in them, hot-cache
+(``weworklocal.cache``) hits and misses and the response size. Each worker
+adds them up in memory and a ``weworklocal.buffers`` thread folds them into
+one Redis hash every ``METRICS_FLUSH_INTERVAL`` seconds, so the numbers
+cover all gunicorn workers. Without Redis they are kept per process.
+
+``metrics_view`` serves the totals as Prometheus text: latency and query
+count histograms plus counters, labelled by view.
+
+The slow-request sampler is off unless ``SLOW_REQUEST_THRESHOLD`` is set.
+A ``SLOW_REQUEST_SAMPLE_RATE`` share of requests then also records its
+SQL, grouped by statement, and when such a request takes longer than the
+threshold the statements that cost the most are kept in a short list
+(``slow_requests_view``) and logged.
+"""
+
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from . import buffers
+
+logger = logging.getLogger('weworklocal')
+
+METRICS_KEY = 'weworklocal:metrics'
+SLOW_REQUESTS_KEY = 'weworklocal:slow-requests'
+
+DURATION_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250)
+
+# name: (Prometheus type, help text, histogram buckets)
+METRICS = {
+    'request_duration_seconds': ('histogram', 'Wall time per request.', DURATION_BUCKETS),
+    'db_queries': ('histogram', 'Database queries per request.', QUERY_BUCKETS),
+    'requests_total': ('counter', 'Requests by status class.', None),
+    'db_query_seconds_total': ('counter', 'Time spent in database queries.', None),
+    'cache_hits_total': ('counter', 'Hot lookup cache hits.', None),
+    'cache_misses_total': ('counter', 'Hot lookup cache misses.', None),
+    'response_bytes_total': ('counter', 'Response body bytes.', None),
+}
+
+# Most expensive statements kept per slow request
+SLOW_REQUEST_TOP_QUERIES = 20
+
+_current = contextvars.ContextVar('weworklocal_request_stats', default=None)
+
+
+class RequestStats:
+    """Counters for the request being served."""
+
+    def __init__(self, sample_queries=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.duration = 0.0
+        # sql -> [count, seconds], only for sampled requests
+        self.statements = defaultdict(lambda: [0, 0.0]) if sample_queries else None
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if self.statements is not None:
+                entry = self.statements[sql]
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def top_statements(self, limit=SLOW_REQUEST_TOP_QUERIES):
+        ranked = sorted(self.statements.items(), key=lambda item: -item[1][1])[:limit]
+        return [
+            {'sql': sql, 'count': count, 'ms': round(seconds * 1000, 2)}
+            for sql, (count, seconds) in ranked
+        ]
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.db_wrapper(execute, sql, params, many, context)
+
+
+@receiver(connection_created, dispatch_uid='weworklocal.metrics.connection_created')
+def install_db_wrapper(sender, connection, **kwargs):
+    """Route every query through ``_db_wrapper``.
+
+    Installed once per connection rather than per request: under ASGI a
+    request's queries run on a sync thread's connection, which the request's
+    context (and so ``_current``) reaches but a per-request
+    ``execute_wrapper()`` in the event loop would not.
+    """
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+# Connections opened before this module was imported
+for _connection in connections.all(initialized_only=True):
+    install_db_wrapper(sender=None, connection=_connection)
+
+
+def count_cache_lookup(hit):
+    """Count a hot-cache hit or miss against the current request, if any."""
+    stats = _current.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+class MemoryMetricsStore:
+    """Per-process totals (fallback when Redis is absent)."""
+
+    def __init__(self):
+        self._values = defaultdict(float)
+        self._slow = deque(maxlen=getattr(settings, 'SLOW_REQUEST_LOG_SIZE', 100))
+        self._lock = threading.Lock()
+
+    def increment_many(self, increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._values[key] += value
+
+    def read_all(self):
+        with self._lock:
+            return dict(self._values)
+
+    def push_slow(self, record):
+        with self._lock:
+            self._slow.appendleft(record)
+
+    def read_slow(self):
+        with self._lock:
+            return list(self._slow)
+
+
+class RedisMetricsStore:
+    """Totals in one Redis hash, shared by all workers."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.slow_log_size = getattr(settings, 'SLOW_REQUEST_LOG_SIZE', 100)
+
+    def increment_many(self, increments):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in increments.items():
+            pipe.hincrbyfloat(METRICS_KEY, '\t'.join(key), value)
+        pipe.execute()
+
+    def read_all(self):
+        return {
+            tuple(field.decode().split('\t')): float(value)
+            for field, value in self.client.hgetall(METRICS_KEY).items()
+        }
+
+    def push_slow(self, record):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lpush(SLOW_REQUESTS_KEY, json.dumps(record))
+        pipe.ltrim(SLOW_REQUESTS_KEY, 0, self.slow_log_size - 1)
+        pipe.execute()
+
+    def read_slow(self):
+        return [json.loads(item) for item in self.client.lrange(SLOW_REQUESTS_KEY, 0, -1)]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide metrics store, built on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _build_store()
+    return _store
+
+
+def _build_store():
+    url = getattr(settings, 'METRICS_REDIS_URL', None)
+    if url:
+        try:
+            store = RedisMetricsStore(url)
+            store.client.ping()
+            return store
+        except Exception:
+            logger.warning('Redis unavailable for request metrics, keeping them per process')
+    return MemoryMetricsStore()
+
+
+class MetricsBuffer(buffers.FlushingBuffer):
+    """Sum metric increments in memory and add them to the store in one go."""
+
+    def __init__(self, max_size=5000, interval=10.0):
+        super().__init__('metrics', max_size=max_size, interval=interval)
+
+    def _empty(self):
+        return defaultdict(float)
+
+    def add(self, increments):
+        with self._lock:
+            for key, value in increments:
+                self._pending[key] += value
+            full = len(self._pending) >= self.max_size
+        self._queued(full)
+
+    def _target(self):
+        return get_store()
+
+    def _write(self, store, pending):
+        store.increment_many(pending)
+
+
+metrics_buffer = buffers.register(MetricsBuffer(
+    interval=getattr(settings, 'METRICS_FLUSH_INTERVAL', 10),
+))
+
+
+def _histogram(name, view, value, buckets):
+    for bound in buckets:
+        if value <= bound:
+            yield (name, view, str(bound)), 1
+    yield (name, view, '+Inf'), 1
+    yield (name, view, 'sum'), value
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+def response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """Record per-view timing, query, cache and size metrics.
+
+    Goes first in MIDDLEWARE so the wall time covers the whole stack. Works
+    in both sync and async stacks, so under ASGI it adds no thread switch.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD', 0)
+        self.sample_rate = getattr(settings, 'SLOW_REQUEST_SAMPLE_RATE', 1.0)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = self._new_stats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        stats.duration = time.perf_counter() - start
+        if self._record(request, response, stats):
+            self.record_slow(request, response, view_name(request), stats.duration, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = self._new_stats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        stats.duration = time.perf_counter() - start
+        if self._record(request, response, stats):
+            await sync_to_async(self.record_slow, thread_sensitive=False)(
+                request, response, view_name(request), stats.duration, stats,
+            )
+        return response
+
+    def _new_stats(self):
+        sample = bool(self.slow_threshold) and random.random() < self.sample_rate
+        return RequestStats(sample_queries=sample)
+
+    def _record(self, request, response, stats):
+        """Queue the request's metrics; return True if it is a slow sample to store."""
+        view = view_name(request)
+        increments = [
+            (('requests_total', view, f'{response.status_code // 100}xx'), 1),
+            (('db_query_seconds_total', view, ''), stats.db_time),
+            (('cache_hits_total', view, ''), stats.cache_hits),
+            (('cache_misses_total', view, ''), stats.cache_misses),
+            (('response_bytes_total', view, ''), response_size(response)),
+        ]
+        increments.extend(_histogram('request_duration_seconds', view, stats.duration, DURATION_BUCKETS))
+        increments.extend(_histogram('db_queries', view, stats.queries, QUERY_BUCKETS))
+        metrics_buffer.add(increments)
+        return stats.statements is not None and stats.duration >= self.slow_threshold
+
+    def record_slow(self, request, response, view, duration, stats):
+        record = {
+            'at': timezone.now().isoformat(),
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round(duration * 1000, 1),
+            'db_ms': round(stats.db_time * 1000, 1),
+            'queries': stats.queries,
+            'top_queries': stats.top_statements(),
+        }
+        logger.warning(
+            'Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms',
+            request.method, request.path, view, record['ms'], stats.queries, record['db_ms'],
+        )
+        try:
+            get_store().push_slow(record)
+        except Exception:
+            logger.warning('Could not store slow request sample')
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def render_prometheus(values):
+    """Format store totals as Prometheus text exposition."""
+    by_metric = defaultdict(dict)
+    for (name, view, label), value in values.items():
+        by_metric[name][(view, label)] = value
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = by_metric.get(name)
+        if not series:
+            continue
+        full_name = f'weworklocal_{name}'
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} {kind}')
+        if kind == 'counter':
+            for view, label in sorted(series):
+                labels = f'view="{_escape(view)}"' + (f',status="{label}"' if label else '')
+                lines.append(f'{full_name}{{{labels}}} {_number(series[(view, label)])}')
+            continue
+        for view in sorted({view for view, _ in series}):
+            view_label = f'view="{_escape(view)}"'
+            for bound in [str(bound) for bound in buckets] + ['+Inf']:
+                count = series.get((view, bound), 0)
+                lines.append(f'{full_name}_bucket{{{view_label},le="{bound}"}} {_number(count)}')
+            lines.append(f'{full_name}_sum{{{view_label}}} {_number(series.get((view, "sum"), 0))}')
+            lines.append(f'{full_name}_count{{{view_label}}} {_number(series.get((view, "+Inf"), 0))}')
+    return '\n'.join(lines) + '\n'
+
+
+def _authorized(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return settings.DEBUG
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return constant_time_compare(header, f'Bearer {token}')
+
+
+@never_cache
+def metrics_view(request):
+    """Prometheus scrape endpoint (``Authorization: Bearer <METRICS_TOKEN>``)."""
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    # Totals lag by up to METRICS_FLUSH_INTERVAL; buffers flush on their own thread.
+    return HttpResponse(
+        render_prometheus(get_store().read_all()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@never_cache
+def slow_requests_view(request):
+    """The most recent sampled slow requests, newest first."""
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return JsonResponse({'requests': get_store().read_slow()})
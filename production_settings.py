@@ -1,9 +1,13 @@
 """
 Production settings for WeWork Web application
 """
+import copy
+import multiprocessing
 import os
-from decouple import config
+from decouple import Csv, config
+import dj_database_url
 from .settings import *
+from .server_mode import SERVER_MODE as GUNICORN_MODE, worker_count
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
@@ -32,6 +36,85 @@ DATABASES = {
     }
 }
 
+# Connection reuse
+# WEWORKLOCAL_PROCESS is set per supervisor program (web, celery, beat) so
+# each kind of process gets its own share of the connection budget.
+# DB_POOL_MODE:
+#   native     - Django's psycopg 3 pool, one pool per process (best for ASGI)
+#   persistent - CONN_MAX_AGE connections with health checks (sync workers)
+#   pgbouncer  - persistent connections to a transaction-mode pgbouncer
+#   off        - a new connection for every request/task
+# GUNICORN_MODE and GUNICORN_WORKERS come from weworklocal.server_mode, which
+# gunicorn_config.py uses too, so these settings always agree with gunicorn.
+PROCESS_ROLE = config('WEWORKLOCAL_PROCESS', default='web')
+DB_POOL_MODE = config('DB_POOL_MODE', default='native' if GUNICORN_MODE == 'asgi' else 'persistent')
+# Connections this app may hold in total (keep below PostgreSQL max_connections)
+DB_MAX_CONNECTIONS = config('DB_MAX_CONNECTIONS', default=80, cast=int)
+CELERY_WORKER_CONCURRENCY = config('CELERY_WORKER_CONCURRENCY', default=multiprocessing.cpu_count(), cast=int)
+
+DB_CONNECTION_SHARE = {'web': 0.7, 'celery': 0.25, 'beat': 0.05}
+
+
+def _process_count(role):
+    """Number of processes of ``role`` sharing the connection budget."""
+    if role == 'celery':
+        return CELERY_WORKER_CONCURRENCY
+    if role == 'beat':
+        return 1
+    return worker_count(GUNICORN_MODE)
+
+
+def _pool_options(role):
+    """psycopg_pool.ConnectionPool arguments sized for one process of ``role``."""
+    budget = int(DB_MAX_CONNECTIONS * DB_CONNECTION_SHARE.get(role, DB_CONNECTION_SHARE['web']))
+    options = {
+        'min_size': 0 if role == 'beat' else 1,
+        'max_size': max(1 if role == 'beat' else 2, budget // _process_count(role)),
+        # Seconds a request waits for a free connection before erroring
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        # Recycle idle and long-lived connections
+        'max_idle': 300,
+        'max_lifetime': 1800,
+    }
+    return options
+
+
+if DB_POOL_MODE == 'native':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    # Django passes the pool ConnectionPool.check_connection when health
+    # checks are on, validating a connection before handing it out.
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['default']['OPTIONS'] = {'pool': _pool_options(PROCESS_ROLE)}
+elif DB_POOL_MODE == 'off' or GUNICORN_MODE == 'asgi':
+    # Persistent connections are not safe under ASGI; use 'native' there.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+if DB_POOL_MODE == 'pgbouncer':
+    # Transaction pooling cannot keep server-side cursors or prepared
+    # statements across transactions.
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASES['default']['OPTIONS'] = {'prepare_threshold': None}
+
+# Read replicas (see settings.py). PostgreSQL replicas share the primary's
+# connection handling (pool, pgbouncer options); other engines, such as a
+# sqlite:/// replica for local testing, keep their own.
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    _replica = dict(dj_database_url.parse(_url), TEST={'MIRROR': 'default'})
+    if 'postgresql' in _replica['ENGINE']:
+        _replica.update({
+            key: copy.deepcopy(value) for key, value in DATABASES['default'].items()
+            if key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'DISABLE_SERVER_SIDE_CURSORS', 'OPTIONS')
+        })
+        _replica.setdefault('OPTIONS', {})['connect_timeout'] = REPLICA_CONNECT_TIMEOUT
+    DATABASES[f'replica{_index}'] = _replica
+
+# nginx reaches gunicorn over its unix socket and appends the client address
+# to X-Forwarded-For; login throttling and audit rows only trust that hop
+LOGIN_THROTTLE_TRUSTED_PROXIES = config('LOGIN_THROTTLE_TRUSTED_PROXIES', default='unix,127.0.0.1', cast=Csv())
+
 # Static files configuration
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -41,7 +124,8 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # WhiteNoise configuration for static files
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+if 'whitenoise.middleware.WhiteNoiseMiddleware' not in MIDDLEWARE:
+    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Security settings
@@ -52,6 +136,9 @@ SECURE_HSTS_SECONDS = 31536000
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
+# nginx always sets X-Forwarded-Proto, so it can be trusted for request.is_secure()
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
 # SSL/HTTPS settings (uncomment when you have SSL certificate)
 # SECURE_SSL_REDIRECT = True
 # SESSION_COOKIE_SECURE = True
@@ -69,13 +156,13 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@your-domain.c
 # Redis configuration for caching and Celery
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 
+# Django's built-in Redis backend (uses the redis package from requirements)
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': REDIS_URL,
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        }
+        'KEY_PREFIX': 'weworklocal',
+        'TIMEOUT': 300,
     }
 }
 
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Report import time for the web, ASGI, Celery and management entry points.
+
+Each entry point is started in a fresh interpreter with ``-X importtime``.
+The report lists the wall time to a ready process, the packages that cost
+the most (summed self time) and the slowest individual modules
+(cumulative time). With --baseline the totals are compared against a saved
+run, and the script exits non-zero when an entry point got slower than
+--tolerance percent, so it can gate deploys as a startup regression check.
+
+Usage:
+    python weworklocal/profile_startup.py [--top 15] [--repeat 3] [--entry web celery]
+    python weworklocal/profile_startup.py --save-baseline startup_baseline.json
+    python weworklocal/profile_startup.py --baseline startup_baseline.json --tolerance 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Code run by each entry point, mirroring what the real process imports
+# before it can serve its first request or task.
+ENTRY_POINTS = {
+    'web': 'import weworklocal.wsgi',
+    'asgi': 'import weworklocal.asgi',
+    'celery': (
+        'import django; django.setup(); '
+        'from weworklocal.celery import app; app.loader.import_default_modules()'
+    ),
+    'manage': 'import django; django.setup()',
+}
+
+# Environment per entry point on top of the caller's
+ENTRY_ENV = {
+    'manage': {'WEWORKLOCAL_LAZY_CELERY': '1'},
+}
+
+
+def profile_entry(name):
+    """Run one entry point; return (wall seconds, [(module, self_us, cumulative_us)])."""
+    env = dict(os.environ, **ENTRY_ENV.get(name, {}))
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'weworklocal.settings')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get('PYTHONPATH')]))
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', ENTRY_POINTS[name]],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(errors[-1] if errors else f'exit code {result.returncode}')
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        modules.append((module.strip(), int(self_us), int(cumulative_us)))
+    return elapsed, modules
+
+
+def report(name, elapsed, modules, top):
+    print(f'\n== {name}: {elapsed * 1000:.0f} ms to ready ({len(modules)} modules imported)')
+
+    packages = defaultdict(int)
+    for module, self_us, _ in modules:
+        packages[module.split('.')[0]] += self_us
+    print(f"  {'package':<40}{'self ms':>10}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f'  {package:<40}{self_us / 1000:>10.1f}')
+
+    print(f"  {'module':<40}{'cumul ms':>10}")
+    for module, _, cumulative_us in sorted(modules, key=lambda item: -item[2])[:top]:
+        print(f'  {module:<40}{cumulative_us / 1000:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entry', nargs='+', choices=sorted(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per entry point; the fastest is kept')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=15.0, help='allowed slowdown in percent')
+    args = parser.parse_args()
+
+    totals = {}
+    for name in args.entry:
+        try:
+            runs = [profile_entry(name) for _ in range(args.repeat)]
+        except RuntimeError as exc:
+            print(f'\n== {name}: failed: {exc}')
+            continue
+        elapsed, modules = min(runs, key=lambda run: run[0])
+        totals[name] = elapsed
+        report(name, elapsed, modules, args.top)
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(totals, indent=2))
+        print(f'\nBaseline saved to {args.save_baseline}')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressed = False
+        print(f"\n{'entry':<10}{'baseline ms':>14}{'now ms':>10}{'change':>10}")
+        for name, elapsed in totals.items():
+            if name not in baseline:
+                continue
+            change = (elapsed - baseline[name]) / baseline[name] * 100
+            flag = '  REGRESSION' if change > args.tolerance else ''
+            regressed = regressed or bool(flag)
+            print(f'{name:<10}{baseline[name] * 1000:>14.0f}{elapsed * 1000:>10.0f}{change:>+9.1f}%{flag}')
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+"""
+Gunicorn server mode and worker count.
+
+Shared by gunicorn_config.py and production_settings.py, so the database
+pools are sized for the workers gunicorn actually starts. Both values come
+from the process environment only, as gunicorn reads them.
+"""
+
+import multiprocessing
+import os
+
+# "wsgi" (sync workers) or "asgi" (uvicorn workers)
+SERVER_MODE = os.environ.get("GUNICORN_MODE", "wsgi")
+
+
+def worker_count(mode=SERVER_MODE):
+    """Worker processes for ``mode``; GUNICORN_WORKERS overrides the default."""
+    cpus = multiprocessing.cpu_count()
+    default = cpus + 1 if mode == "asgi" else cpus * 2 + 1
+    return int(os.environ.get("GUNICORN_WORKERS", default))
@@ -3,9 +3,8 @@ Django settings for weworklocal project (VPS-ready version).
 """
 
 import os
-import socket
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 # Build paths inside the project
@@ -17,13 +16,6 @@ DEBUG = config('DEBUG', default=False, cast=bool)
 
 # ALLOWED_HOSTS
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'testserver', '*']
-# Add VPS LAN IP automatically
-try:
-    lan_ip = socket.gethostbyname(socket.gethostname())
-    if lan_ip and lan_ip not in ALLOWED_HOSTS:
-        ALLOWED_HOSTS.append(lan_ip)
-except Exception:
-    pass
 
 # Application definition
 INSTALLED_APPS = [
@@ -52,6 +44,9 @@ INSTALLED_APPS = [
     'wallets',
     'referrals',
     'support',
+
+    # Project package: connects the hot-cache invalidation receivers
+    'weworklocal',
 ]
 
 SITE_ID = 1
@@ -66,6 +61,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'allauth.account.middleware.AccountMiddleware',  # MUST be after auth middleware
+    'weworklocal.activity.SessionActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -99,6 +95,43 @@ DATABASES = {
     }
 }
 
+# --- Read replicas (weworklocal.db_router) ---
+# Comma-separated database URLs; each becomes a 'replicaN' alias. For local
+# testing a second SQLite file works: sqlite:///db_replica.sqlite3
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+# Seconds to wait for a replica connection; an unreachable replica must fail
+# fast because its health check runs on the request path
+REPLICA_CONNECT_TIMEOUT = config('REPLICA_CONNECT_TIMEOUT', default=2, cast=int)
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica{_index}'] = dict(dj_database_url.parse(_url), TEST={'MIRROR': 'default'})
+    if 'postgresql' in DATABASES[f'replica{_index}']['ENGINE']:
+        DATABASES[f'replica{_index}'].setdefault('OPTIONS', {})['connect_timeout'] = REPLICA_CONNECT_TIMEOUT
+if DATABASE_REPLICA_URLS:
+    DATABASE_ROUTERS = ['weworklocal.db_router.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'weworklocal.db_router.PrimaryPinMiddleware',
+    )
+# Read-only traffic that may be served from a replica: app labels or
+# app_label.modelname. Wallet, payment, withdrawal, commission and ledger
+# models must never be listed.
+DATABASE_REPLICA_MODELS = [
+    'properties.property',
+    'properties.propertyimage',
+    'properties.propertycategory',
+    'referrals.referraltree',
+    'referrals.mlmstats',
+    'referrals.cleanreferral',
+    'support.faq',
+    'core.banner',
+    'core.executivecontact',
+]
+# Skip a replica lagging more than this many seconds
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=float)
+REPLICA_HEALTH_CHECK_INTERVAL = 5
+# Keep a user's reads on the primary this long after they write
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator', 'OPTIONS': {'min_length': 6}},
@@ -153,11 +186,15 @@ REST_FRAMEWORK = {
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
+    "http://localhost:8000",
+    "http://127.0.0.1:8000",
 ]
 CORS_ALLOW_CREDENTIALS = True
 
 # --- Django Allauth updated settings ---
 AUTHENTICATION_BACKENDS = [
+    # Must stay first: rejects throttled logins before passwords are checked
+    'weworklocal.throttling.LoginThrottleBackend',
     'django.contrib.auth.backends.ModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
@@ -169,6 +206,30 @@ ACCOUNT_EMAIL_VERIFICATION = 'mandatory'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Login throttling (weworklocal.throttling): failed attempts allowed per
+# sliding window, counted per email, per IP and per /24 subnet
+LOGIN_THROTTLE_REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+LOGIN_THROTTLE_WINDOW = config('LOGIN_THROTTLE_WINDOW', default=900, cast=int)
+LOGIN_THROTTLE_LIMITS = {
+    'email': config('LOGIN_THROTTLE_EMAIL_LIMIT', default=5, cast=int),
+    'ip': config('LOGIN_THROTTLE_IP_LIMIT', default=20, cast=int),
+    'subnet': config('LOGIN_THROTTLE_SUBNET_LIMIT', default=100, cast=int),
+}
+# REMOTE_ADDRs of reverse proxies whose X-Forwarded-For is believed ("unix"
+# for a unix socket). Empty means the header is ignored, as it must be when
+# clients reach gunicorn directly (Procfile deployment).
+LOGIN_THROTTLE_TRUSTED_PROXIES = config('LOGIN_THROTTLE_TRUSTED_PROXIES', default='', cast=Csv())
+# login_attempts audit rows are written in batches of this size or every N seconds
+LOGIN_ATTEMPT_BUFFER_SIZE = 100
+LOGIN_ATTEMPT_FLUSH_INTERVAL = 5
+
+# Buffered activity writes (weworklocal.activity)
+AUDIT_LOG_BUFFER_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 5
+# user_sessions.last_activity is written at most once per this many seconds
+SESSION_ACTIVITY_INTERVAL = config('SESSION_ACTIVITY_INTERVAL', default=60, cast=int)
+SESSION_ACTIVITY_FLUSH_INTERVAL = 5
+
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
@@ -191,6 +252,35 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Caching
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'weworklocal',
+    }
+}
+# Hot lookups (weworklocal.lookups): shared-tier timeout, and size/TTL of the
+# per-process LRU in front of it. The local TTL bounds how stale another
+# worker's copy can be after a save/delete.
+HOT_CACHE_TIMEOUT = config('HOT_CACHE_TIMEOUT', default=300, cast=int)
+LOCAL_CACHE_MAXSIZE = config('LOCAL_CACHE_MAXSIZE', default=512, cast=int)
+LOCAL_CACHE_TTL = config('LOCAL_CACHE_TTL', default=5, cast=int)
+
+# Per-view request metrics (weworklocal.metrics), summed across workers in
+# Redis and scraped from /metrics/ with "Authorization: Bearer METRICS_TOKEN"
+# (without a token the endpoint only answers when DEBUG is on)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_FLUSH_INTERVAL = 10
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'weworklocal.metrics.RequestMetricsMiddleware')
+# Slow-request sampler: off unless a threshold in seconds is set. That share
+# of requests records its SQL; the slowest are kept at /metrics/slow/.
+SLOW_REQUEST_THRESHOLD = config('SLOW_REQUEST_THRESHOLD', default=0, cast=float)
+SLOW_REQUEST_SAMPLE_RATE = config('SLOW_REQUEST_SAMPLE_RATE', default=0.1, cast=float)
+SLOW_REQUEST_LOG_SIZE = 100
+
 # WeWorkLocal specific settings
 COMPANY_NAME = config('COMPANY_NAME', default='WeWorkLocal')
 COMPANY_COMMISSION_RATE = config('COMPANY_COMMISSION_RATE', default=0.2, cast=float)
@@ -219,67 +309,6 @@ VENDOR_PLANS = {
 UPI_ID = config('UPI_ID', default='your-upi-id@paytm')
 UPI_NAME = config('UPI_NAME', default='WeWorkLocal')
 
-# Django REST Framework
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-    ],
-    'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.IsAuthenticated',
-    ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20,
-}
-
-# CORS Settings
-CORS_ALLOWED_ORIGINS = [
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-    "http://localhost:8000",
-    "http://127.0.0.1:8000",
-]
-CORS_ALLOW_CREDENTIALS = True
-
-# Django Allauth
-AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
-    'allauth.account.auth_backends.AuthenticationBackend',
-]
-
-ACCOUNT_EMAIL_REQUIRED = True
-ACCOUNT_USERNAME_REQUIRED = True
-ACCOUNT_EMAIL_VERIFICATION = 'mandatory'
-ACCOUNT_AUTHENTICATION_METHOD = 'username_email'
-LOGIN_REDIRECT_URL = '/dashboard/'
-LOGOUT_REDIRECT_URL = '/'
-
-# Email Configuration
-EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
-EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
-EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
-EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
-EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
-EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
-
-# Channels Configuration
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            "hosts": [config('REDIS_URL', default='redis://localhost:6379/0')],
-        },
-    },
-}
-
-# Celery Configuration
-CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'UTC'
-
 # Logging
 LOGGING = {
     'version': 1,
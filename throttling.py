@@ -0,0 +1,283 @@
+"""
+Sliding-window login throttling.
+
+Failed logins are counted per email, per client IP and per /24 (IPv4) or
+/64 (IPv6) subnet. Each counter is a sliding-window approximation over two
+fixed buckets: the current bucket plus the previous one weighted by how
+much of it still overlaps the window. Checking or recording an attempt is
+O(1), one Redis round trip. Without Redis the counters are kept per
+process.
+
+``LoginThrottleBackend`` goes first in AUTHENTICATION_BACKENDS, so it is
+consulted by both Django's and allauth's login flows before any password
+is checked. ``login_attempts`` rows are audit-only and are written in
+batches by ``weworklocal.buffers``.
+"""
+
+import ipaddress
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.core.exceptions import PermissionDenied
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import buffers
+
+logger = logging.getLogger('weworklocal')
+
+KEY_PREFIX = 'login-throttle:'
+THROTTLED_MESSAGE = 'Too many failed login attempts. Please try again later.'
+
+login_attempt_buffer = buffers.register(buffers.BulkInsertBuffer(
+    'authentication.LoginAttempt',
+    max_size=getattr(settings, 'LOGIN_ATTEMPT_BUFFER_SIZE', 100),
+    interval=getattr(settings, 'LOGIN_ATTEMPT_FLUSH_INTERVAL', 5),
+))
+
+
+class MemoryCounterStore:
+    """Per-process fixed-bucket counters (fallback when Redis is absent)."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        with self._lock:
+            return [self._counts.get(key, (0, 0))[0] for key in keys]
+
+    def incr_many(self, keys, ttl):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                count, _ = self._counts.get(key, (0, 0))
+                self._counts[key] = (count + 1, now + ttl)
+            if len(self._counts) > 10000:
+                self._counts = {
+                    key: value for key, value in self._counts.items() if value[1] > now
+                }
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._counts.pop(key, None)
+
+
+class RedisCounterStore:
+    """Fixed-bucket counters in Redis, shared by all workers."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get_many(self, keys):
+        return [int(value or 0) for value in self.client.mget(keys)]
+
+    def incr_many(self, keys, ttl):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def delete_many(self, keys):
+        self.client.delete(*keys)
+
+
+class SlidingWindowThrottle:
+    """Sliding-window failure counters for login identifiers."""
+
+    def __init__(self, store, window, limits):
+        self.store = store
+        self.fallback = MemoryCounterStore()
+        self.window = window
+        self.limits = limits
+
+    def _bucket_keys(self, scope, value, now):
+        bucket = int(now // self.window)
+        base = f'{KEY_PREFIX}{scope}:{value}:'
+        return base + str(bucket), base + str(bucket - 1)
+
+    def _call(self, method, *args):
+        try:
+            return getattr(self.store, method)(*args)
+        except Exception:
+            # Never fail logins because Redis is down; degrade to local counts.
+            logger.warning('Login throttle store unavailable, using process-local counters')
+            return getattr(self.fallback, method)(*args)
+
+    def counts(self, identifiers, now=None):
+        """Return the weighted failure count for each ``(scope, value)``."""
+        now = time.time() if now is None else now
+        keys = []
+        for scope, value in identifiers:
+            keys.extend(self._bucket_keys(scope, value, now))
+        values = self._call('get_many', keys)
+        overlap = 1 - (now % self.window) / self.window
+        return {
+            identifier: values[2 * i] + values[2 * i + 1] * overlap
+            for i, identifier in enumerate(identifiers)
+        }
+
+    def is_blocked(self, identifiers):
+        for (scope, value), count in self.counts(identifiers).items():
+            if count >= self.limits[scope]:
+                return True
+        return False
+
+    def record_failure(self, identifiers):
+        now = time.time()
+        keys = [self._bucket_keys(scope, value, now)[0] for scope, value in identifiers]
+        self._call('incr_many', keys, 2 * self.window)
+
+    def reset(self, identifiers):
+        if not identifiers:
+            return
+        now = time.time()
+        keys = []
+        for scope, value in identifiers:
+            keys.extend(self._bucket_keys(scope, value, now))
+        self._call('delete_many', keys)
+
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+
+def get_throttle():
+    """The process-wide throttle, built on first use.
+
+    Building it pings Redis, which is kept out of import time so loading
+    the auth backends or middleware never waits on the network.
+    """
+    global _throttle
+    if _throttle is None:
+        with _throttle_lock:
+            if _throttle is None:
+                _throttle = _build_throttle()
+    return _throttle
+
+
+def _build_throttle():
+    url = getattr(settings, 'LOGIN_THROTTLE_REDIS_URL', None)
+    store = MemoryCounterStore()
+    if url:
+        try:
+            store = RedisCounterStore(url)
+            store.client.ping()
+        except Exception:
+            logger.warning('Redis unavailable for login throttling, using process-local counters')
+            store = MemoryCounterStore()
+    return SlidingWindowThrottle(
+        store,
+        window=getattr(settings, 'LOGIN_THROTTLE_WINDOW', 900),
+        limits=getattr(settings, 'LOGIN_THROTTLE_LIMITS', {'email': 5, 'ip': 20, 'subnet': 100}),
+    )
+
+
+def get_client_ip(request):
+    """Client address for throttling and audit rows.
+
+    X-Forwarded-For is only believed when the connection comes from one of
+    ``LOGIN_THROTTLE_TRUSTED_PROXIES`` (nginx), and then only its last hop,
+    the one nginx appended. Anyone else can put any address in it, so
+    otherwise REMOTE_ADDR is used. The result is always a valid address
+    or ''.
+    """
+    if request is None:
+        return ''
+    remote = request.META.get('REMOTE_ADDR', '')
+    candidates = [remote]
+    # A unix-socket connection has no address; "unix" stands for it.
+    if (remote or 'unix') in getattr(settings, 'LOGIN_THROTTLE_TRUSTED_PROXIES', ()):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        candidates.insert(0, forwarded.split(',')[-1].strip())
+    for candidate in candidates:
+        try:
+            address = ipaddress.ip_address(candidate)
+        except ValueError:
+            continue
+        # inet columns reject IPv6 zone ids ("fe80::1%eth0")
+        if getattr(address, 'scope_id', None) is None:
+            return str(address)
+    return ''
+
+
+def get_identifiers(email, ip):
+    """The ``(scope, value)`` pairs an attempt is counted against."""
+    identifiers = []
+    if email:
+        identifiers.append(('email', email.strip().lower()))
+    if ip:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return identifiers
+        prefix = 24 if address.version == 4 else 64
+        identifiers.append(('ip', str(address)))
+        identifiers.append(('subnet', str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))))
+    return identifiers
+
+
+def _login_identifier(credentials):
+    return credentials.get('email') or credentials.get('username') or ''
+
+
+class LoginThrottleBackend:
+    """Authentication backend that rejects logins while throttled.
+
+    It never authenticates anyone itself: it either raises PermissionDenied,
+    which stops ``authenticate()`` before the remaining backends run, or
+    returns None so the next backend checks the password.
+
+    ``authenticate()`` turns PermissionDenied into an ordinary failed login,
+    so the request is marked (``login_failed`` must not count it, or
+    retrying would extend the lockout forever) and the reason is passed to
+    the user as a message instead of the generic credentials error.
+    """
+
+    def authenticate(self, request, **credentials):
+        identifiers = get_identifiers(_login_identifier(credentials), get_client_ip(request))
+        if identifiers and get_throttle().is_blocked(identifiers):
+            if request is not None and not getattr(request, '_login_throttled', False):
+                request._login_throttled = True
+                messages.error(request, THROTTLED_MESSAGE, fail_silently=True)
+            raise PermissionDenied(THROTTLED_MESSAGE)
+        return None
+
+    def get_user(self, user_id):
+        return None
+
+
+def _record_attempt(email, request, success):
+    login_attempt_buffer.add(
+        email=email[:254],
+        ip_address=get_client_ip(request) or '0.0.0.0',
+        success=success,
+        user_agent=request.META.get('HTTP_USER_AGENT', '') if request is not None else '',
+        attempted_at=timezone.now(),
+    )
+
+
+@receiver(user_login_failed, dispatch_uid='weworklocal.throttling.login_failed')
+def login_failed(sender, credentials, request=None, **kwargs):
+    email = _login_identifier(credentials)
+    # Attempts rejected by the throttle itself are audited but not counted.
+    if not getattr(request, '_login_throttled', False):
+        get_throttle().record_failure(get_identifiers(email, get_client_ip(request)))
+    _record_attempt(email, request, success=False)
+
+
+@receiver(user_logged_in, dispatch_uid='weworklocal.throttling.logged_in')
+def logged_in(sender, request, user, **kwargs):
+    email = getattr(user, 'email', '') or ''
+    # A successful login clears the account's failures (under either login
+    # identifier), not the IP's or subnet's.
+    for identifier in {email, user.get_username()} - {''}:
+        get_throttle().reset(get_identifiers(identifier, None))
+    _record_attempt(email, request, success=True)
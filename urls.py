@@ -20,6 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from core import views as core_views
 from core.admin_dashboard import admin_dashboard_view
+from weworklocal import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -28,6 +29,10 @@ urlpatterns = [
     # Health check for Docker and load balancers
     path('health/', core_views.health_check, name='health_check'),
 
+    # Per-view request metrics (Prometheus) and sampled slow requests
+    path('metrics/', metrics.metrics_view, name='metrics'),
+    path('metrics/slow/', metrics.slow_requests_view, name='slow_requests'),
+
     # Core app URLs
     path('', core_views.landing_page, name='landing'),
     path('splash/', core_views.splash_screen, name='splash'),
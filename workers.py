@@ -0,0 +1,27 @@
+"""
+Gunicorn worker classes for the ASGI deployment mode (GUNICORN_MODE=asgi).
+"""
+
+from uvicorn_worker import UvicornWorker
+
+
+class DjangoUvicornWorker(UvicornWorker):
+    """Uvicorn worker tuned for Django/Channels behind nginx.
+
+    Django's ASGI handler does not implement the lifespan protocol, so it is
+    turned off rather than probed on every worker start.
+
+    uvicorn's proxy header handling is off: on a unix socket it only applies
+    with forwarded_allow_ips="*", and then takes the leftmost, client-supplied
+    X-Forwarded-For entry as the client address. Django resolves both headers
+    itself, as under sync workers: the client address in
+    ``weworklocal.throttling.get_client_ip`` and the scheme through
+    SECURE_PROXY_SSL_HEADER.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": "auto",
+        "http": "auto",
+        "lifespan": "off",
+        "proxy_headers": False,
+    }